@@ -1,10 +1,73 @@
-from prometheus_client import Gauge, Counter, Histogram
+from prometheus_client import Gauge, Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeHistogramMetricFamily
 from datetime import datetime
+import heapq
 import logging
 import json
+from db.partitioned import run_partitioned, partition_source, merge_counts
+from config import CHAT_SCAN_PARTITIONS, CHAT_LARGEST_TOP_N
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds of the chat size distribution buckets
+CHAT_MESSAGE_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+CHAT_BYTES_BUCKETS = [1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864]
+
+
+def _bucket_thresholds(bounds):
+    """
+    Thresholds for width_bucket() so that bucket i holds values in
+    (bounds[i-1], bounds[i]], matching Prometheus 'le' semantics for integers.
+    """
+    return 'ARRAY[' + ', '.join(str(bound + 1) for bound in bounds) + ']'
+
+
+class ChatSizeDistribution:
+    """
+    Custom collector exposing the latest per-model chat size distributions as
+    gauge histograms. Unlike Histogram, the buckets describe the current state
+    of the table and are replaced on every collection.
+    """
+
+    def __init__(self):
+        self.distributions = {}
+
+    def update(self, distributions):
+        self.distributions = distributions
+
+    def describe(self):
+        return self._families({})
+
+    def collect(self):
+        return self._families(self.distributions)
+
+    def _families(self, distributions):
+        messages = GaugeHistogramMetricFamily(
+            'openwebui_chat_messages_per_chat',
+            'Distribution of the number of messages per chat by model',
+            labels=['model_name']
+        )
+        size = GaugeHistogramMetricFamily(
+            'openwebui_chat_size_bytes',
+            'Distribution of the stored size of chats (pg_column_size) by model',
+            labels=['model_name']
+        )
+        for model_name, dist in distributions.items():
+            messages.add_metric([model_name], self._cumulative(CHAT_MESSAGE_BUCKETS, dist['message_buckets']),
+                                dist['message_sum'])
+            size.add_metric([model_name], self._cumulative(CHAT_BYTES_BUCKETS, dist['bytes_buckets']),
+                            dist['bytes_sum'])
+        return [messages, size]
+
+    @staticmethod
+    def _cumulative(bounds, counts):
+        buckets = []
+        total = 0
+        for bound, count in zip(bounds + [float('inf')], counts):
+            total += count
+            buckets.append(('+Inf' if bound == float('inf') else str(bound), total))
+        return buckets
+
 class ChatMetricsCollector:
     """Collector for chat-related metrics"""
 
@@ -36,154 +99,253 @@ def __init__(self, db_pool):
         # Total messages across all chats
         self.messages_total = Gauge('openwebui_messages_total', 'Total number of messages across all chats')
 
-        # Start collecting metrics
-        self.collect_metrics()
+        # Chat size distribution and largest chats
+        self.size_distribution = ChatSizeDistribution()
+        REGISTRY.register(self.size_distribution)
+        self.largest_chats = Gauge('openwebui_chat_largest_bytes',
+                                 'Stored size of the largest chats',
+                                 ['rank', 'chat_id', 'user_id'])
 
     def collect_metrics(self):
         """Collect all chat-related metrics"""
         try:
-            with self.db_pool.get_connection() as cur:
-                # Total chats (all)
-                cur.execute("SELECT COUNT(*) FROM public.chat")
-                self.total_chats.set(cur.fetchone()[0])
-
-                # Total chats by model
-                cur.execute("""
-                    WITH chat_models AS (
-                        SELECT DISTINCT
-                            c.id,
-                            json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
-                        FROM public.chat c
-                        WHERE c.chat->'messages' IS NOT NULL
-                    )
-                    SELECT
-                        model_name,
-                        COUNT(DISTINCT id)
-                    FROM chat_models
-                    WHERE model_name IS NOT NULL
-                    GROUP BY model_name
-                """)
-                for model_name, count in cur.fetchall():
-                    self.total_chats_by_model.labels(model_name=model_name).set(count)
-
-
-                # Archived chats by model
-                cur.execute("""
-                    WITH chat_models AS (
-                        SELECT DISTINCT
-                            c.id,
-                            json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
-                        FROM public.chat c
-                        WHERE c.chat->'messages' IS NOT NULL
-                        AND c.archived = true
-                    )
-                    SELECT
-                        model_name,
-                        COUNT(DISTINCT id)
-                    FROM chat_models
-                    WHERE model_name IS NOT NULL
-                    GROUP BY model_name
-                """)
-                for model_name, count in cur.fetchall():
-                    self.archived_chats.labels(model_name=model_name).set(count)
-
-                # Pinned chats by model
-                cur.execute("""
-                    WITH chat_models AS (
-                        SELECT DISTINCT
-                            c.id,
-                            json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
-                        FROM public.chat c
-                        WHERE c.chat->'messages' IS NOT NULL
-                        AND c.pinned = true
-                    )
+            partials = run_partitioned(self.db_pool, self._scan_partition, CHAT_SCAN_PARTITIONS)
+
+            # Total chats (all)
+            self.total_chats.set(sum(p['total_chats'] for p in partials))
+
+            # Total chats by model and chat size distributions
+            distributions = self._merge_distributions(p['chats_by_model'] for p in partials)
+            for model_name, dist in distributions.items():
+                self.total_chats_by_model.labels(model_name=model_name).set(dist['count'])
+            self.size_distribution.update(distributions)
+
+            # Largest chats (with messages); partitions each return their own top N
+            largest = heapq.nlargest(
+                CHAT_LARGEST_TOP_N,
+                (row for p in partials for row in p['largest_chats']),
+                key=lambda row: row[2]
+            )
+            self.largest_chats.clear()
+            for rank, (chat_id, user_id, chat_bytes) in enumerate(largest, start=1):
+                self.largest_chats.labels(rank=str(rank), chat_id=chat_id, user_id=user_id).set(chat_bytes)
+
+            # Archived chats by model
+            for (model_name,), count in merge_counts(p['archived_chats'] for p in partials).items():
+                self.archived_chats.labels(model_name=model_name).set(count)
+
+            # Pinned chats by model
+            for (model_name,), count in merge_counts(p['pinned_chats'] for p in partials).items():
+                self.pinned_chats.labels(model_name=model_name).set(count)
+
+            # Chats by user; partitions hold disjoint chat ids so per-partition
+            # distinct chat counts add up
+            logger.info("Debug - Query results:")
+            for row, count in merge_counts(p['chats_by_user'] for p in partials).items():
+                logger.info(f"User: {row[0]}, Name: {row[1]}, Email: {row[2]}, Model: {row[3]}, Count: {count}")
+                self.chats_by_user.labels(
+                    user_id=row[0],
+                    user_name=row[1],
+                    user_email=row[2],
+                    model_name=row[3]
+                ).set(count)
+
+            # Shared chats
+            self.shared_chats.set(sum(p['shared_chats'] for p in partials))
+
+            # Message count by model
+            for (model_name,), count in merge_counts(p['messages_by_model'] for p in partials).items():
+                self.messages_by_model.labels(model_name=model_name).set(count)
+                logger.info(f"Messages for model {model_name}: {count}")
+
+            # Total messages across all chats
+            total_messages = sum(p['total_messages'] for p in partials)
+            self.messages_total.set(total_messages)
+            logger.info(f"Total messages count: {total_messages}")
+
+        except Exception as e:
+            logger.error(f"Error collecting chat metrics: {e}")
+            raise
+
+    @staticmethod
+    def _merge_distributions(partials):
+        """Merge bucketed (model, message bucket, bytes bucket, ...) rows into per-model distributions"""
+        distributions = {}
+        for rows in partials:
+            for model_name, message_bucket, bytes_bucket, count, message_sum, bytes_sum in rows:
+                dist = distributions.setdefault(model_name, {
+                    'count': 0,
+                    'message_buckets': [0] * (len(CHAT_MESSAGE_BUCKETS) + 1),
+                    'message_sum': 0,
+                    'bytes_buckets': [0] * (len(CHAT_BYTES_BUCKETS) + 1),
+                    'bytes_sum': 0,
+                })
+                dist['count'] += count
+                dist['message_buckets'][message_bucket] += count
+                dist['message_sum'] += message_sum or 0
+                dist['bytes_buckets'][bytes_bucket] += count
+                dist['bytes_sum'] += bytes_sum or 0
+        return distributions
+
+    def _scan_partition(self, cur, index, count):
+        """Run the chat aggregation queries over one hash partition of public.chat"""
+        chats = partition_source('public.chat', index, count)
+        result = {}
+
+        # Total chats (all)
+        cur.execute(f"SELECT COUNT(*) FROM {chats} c")
+        result['total_chats'] = cur.fetchone()[0]
+
+        # Total chats by model, bucketed by message count and stored size, and
+        # the partition's largest chats, all from a single pass over the chats.
+        # Per-chat values are computed once in the OFFSET 0 subquery before the
+        # messages are expanded, rather than once per message. chat_models is
+        # MATERIALIZED so both branches read the same scan; largest-chat rows
+        # are told apart by a non-NULL chat_id.
+        cur.execute(f"""
+            WITH chat_models AS MATERIALIZED (
+                SELECT DISTINCT
+                    m.id,
+                    m.user_id,
+                    e.message::jsonb->>'model' as model_name,
+                    m.message_count,
+                    m.chat_bytes
+                FROM (
                     SELECT
-                        model_name,
-                        COUNT(DISTINCT id)
-                    FROM chat_models
-                    WHERE model_name IS NOT NULL
-                    GROUP BY model_name
-                """)
-                for model_name, count in cur.fetchall():
-                    self.pinned_chats.labels(model_name=model_name).set(count)
-
-                # Debug: Print the SQL query and results
-                debug_query = """
-                    SELECT DISTINCT
+                        c.id,
                         c.user_id,
-                        u.name,
-                        u.email,
-                        json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name,
-                        COUNT(DISTINCT c.id) as chat_count
-                    FROM public.chat c
-                    JOIN public.user u ON c.user_id = u.id
+                        c.chat->'messages' as messages,
+                        json_array_length(c.chat->'messages') as message_count,
+                        pg_column_size(c.chat) as chat_bytes
+                    FROM {chats} c
                     WHERE c.chat->'messages' IS NOT NULL
-                    GROUP BY c.user_id, u.name, u.email, model_name
-                """
-                cur.execute(debug_query)
-                results = cur.fetchall()
-                logger.info("Debug - Query results:")
-                for row in results:
-                    logger.info(f"User: {row[0]}, Name: {row[1]}, Email: {row[2]}, Model: {row[3]}, Count: {row[4]}")
-                    self.chats_by_user.labels(
-                        user_id=row[0],
-                        user_name=row[1],
-                        user_email=row[2],
-                        model_name=row[3]
-                    ).set(row[4])
-
-                # Shared chats
-                cur.execute("SELECT COUNT(*) FROM public.chat WHERE share_id IS NOT NULL")
-                self.shared_chats.set(cur.fetchone()[0])
-
-                # Message count by model
-                cur.execute("""
-                    WITH message_models AS (
-                        SELECT
-                            json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
-                        FROM public.chat c
-                        WHERE c.chat->'messages' IS NOT NULL
-                    )
-                    SELECT
-                        model_name,
-                        COUNT(*) as message_count
-                    FROM message_models
-                    WHERE model_name IS NOT NULL
-                    GROUP BY model_name
-                """)
-                for model_name, count in cur.fetchall():
-                    self.messages_by_model.labels(model_name=model_name).set(count)
-                    logger.info(f"Messages for model {model_name}: {count}")
-
-                # Total messages across all chats - calculate from the sum of messages by model
-                # This ensures consistency between the two metrics
-                total_messages = 0
-
-                # First, get the count of messages with models
-                cur.execute("""
-                    WITH message_models AS (
-                        SELECT
-                            json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
-                        FROM public.chat c
-                        WHERE c.chat->'messages' IS NOT NULL
-                    )
-                    SELECT
-                        SUM(message_count) as total_count
-                    FROM (
-                        SELECT
-                            model_name,
-                            COUNT(*) as message_count
-                        FROM message_models
-                        GROUP BY model_name
-                    ) as model_counts
-                """)
-                result = cur.fetchone()
-                if result and result[0]:
-                    total_messages = result[0]
-
-                # Set the metric
-                self.messages_total.set(total_messages)
-                logger.info(f"Total messages count: {total_messages}")
+                    OFFSET 0
+                ) m
+                CROSS JOIN LATERAL json_array_elements(m.messages) as e(message)
+            ),
+            buckets AS (
+                SELECT
+                    model_name,
+                    width_bucket(message_count, {_bucket_thresholds(CHAT_MESSAGE_BUCKETS)}) as message_bucket,
+                    width_bucket(chat_bytes, {_bucket_thresholds(CHAT_BYTES_BUCKETS)}) as bytes_bucket,
+                    COUNT(DISTINCT id) as chat_count,
+                    SUM(message_count) as message_sum,
+                    SUM(chat_bytes) as bytes_sum
+                FROM chat_models
+                WHERE model_name IS NOT NULL
+                GROUP BY model_name, message_bucket, bytes_bucket
+            ),
+            largest AS (
+                SELECT DISTINCT id, user_id, chat_bytes
+                FROM chat_models
+                ORDER BY chat_bytes DESC
+                LIMIT {max(0, int(CHAT_LARGEST_TOP_N))}
+            )
+            SELECT model_name, message_bucket, bytes_bucket, chat_count, message_sum, bytes_sum,
+                   NULL::text, NULL::text
+            FROM buckets
+            UNION ALL
+            SELECT NULL, NULL, NULL, NULL, NULL, chat_bytes, id::text, user_id::text
+            FROM largest
+        """)
+        rows = cur.fetchall()
+        result['chats_by_model'] = [row[:6] for row in rows if row[6] is None]
+        result['largest_chats'] = [(row[6], row[7], row[5]) for row in rows if row[6] is not None]
 
-        except Exception as e:
-            logger.error(f"Error collecting chat metrics: {e}")
+        # Archived chats by model
+        cur.execute(f"""
+            WITH chat_models AS (
+                SELECT DISTINCT
+                    c.id,
+                    json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
+                FROM {chats} c
+                WHERE c.chat->'messages' IS NOT NULL
+                AND c.archived = true
+            )
+            SELECT
+                model_name,
+                COUNT(DISTINCT id)
+            FROM chat_models
+            WHERE model_name IS NOT NULL
+            GROUP BY model_name
+        """)
+        result['archived_chats'] = cur.fetchall()
+
+        # Pinned chats by model
+        cur.execute(f"""
+            WITH chat_models AS (
+                SELECT DISTINCT
+                    c.id,
+                    json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
+                FROM {chats} c
+                WHERE c.chat->'messages' IS NOT NULL
+                AND c.pinned = true
+            )
+            SELECT
+                model_name,
+                COUNT(DISTINCT id)
+            FROM chat_models
+            WHERE model_name IS NOT NULL
+            GROUP BY model_name
+        """)
+        result['pinned_chats'] = cur.fetchall()
+
+        # Chats by user and model
+        cur.execute(f"""
+            SELECT DISTINCT
+                c.user_id,
+                u.name,
+                u.email,
+                json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name,
+                COUNT(DISTINCT c.id) as chat_count
+            FROM {chats} c
+            JOIN public.user u ON c.user_id = u.id
+            WHERE c.chat->'messages' IS NOT NULL
+            GROUP BY c.user_id, u.name, u.email, model_name
+        """)
+        result['chats_by_user'] = cur.fetchall()
+
+        # Shared chats
+        cur.execute(f"SELECT COUNT(*) FROM {chats} c WHERE share_id IS NOT NULL")
+        result['shared_chats'] = cur.fetchone()[0]
+
+        # Message count by model
+        cur.execute(f"""
+            WITH message_models AS (
+                SELECT
+                    json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
+                FROM {chats} c
+                WHERE c.chat->'messages' IS NOT NULL
+            )
+            SELECT
+                model_name,
+                COUNT(*) as message_count
+            FROM message_models
+            WHERE model_name IS NOT NULL
+            GROUP BY model_name
+        """)
+        result['messages_by_model'] = cur.fetchall()
+
+        # Total messages, including messages without a model, counted the
+        # same way as the per-model query so the two stay consistent
+        cur.execute(f"""
+            WITH message_models AS (
+                SELECT
+                    json_array_elements(c.chat->'messages')::jsonb->>'model' as model_name
+                FROM {chats} c
+                WHERE c.chat->'messages' IS NOT NULL
+            )
+            SELECT
+                SUM(message_count) as total_count
+            FROM (
+                SELECT
+                    model_name,
+                    COUNT(*) as message_count
+                FROM message_models
+                GROUP BY model_name
+            ) as model_counts
+        """)
+        row = cur.fetchone()
+        result['total_messages'] = row[0] if row and row[0] else 0
+
+        return result
@@ -26,9 +26,6 @@ def __init__(self, db_pool):
         # Prompt metrics
         self.total_prompts = Gauge('openwebui_prompts_total', 'Total number of prompts')
 
-        # Start collecting metrics
-        self.collect_metrics()
-
     def collect_metrics(self):
         """Collect all document-related metrics"""
         try:
@@ -69,3 +66,4 @@ def collect_metrics(self):
 
         except Exception as e:
             logger.error(f"Error collecting document metrics: {e}")
+            raise
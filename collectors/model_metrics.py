@@ -1,5 +1,7 @@
 from prometheus_client import Gauge, Counter
 import logging
+from db.partitioned import run_partitioned, partition_source
+from config import CHAT_SCAN_PARTITIONS
 
 logger = logging.getLogger(__name__)
 
@@ -30,9 +32,6 @@ def __init__(self, db_pool):
         self.global_functions = Gauge('openwebui_functions_global',
                                    'Number of global functions')
 
-        # Start collecting metrics
-        self.collect_metrics()
-
     def collect_metrics(self):
         """Collect all model-related metrics"""
         try:
@@ -49,27 +48,30 @@ def collect_metrics(self):
                 self.active_models.set(cur.fetchone()[0])
 
                 # Unique users by model name (based on actual usage in chats)
-                cur.execute("""
-                    WITH chat_models AS (
-                        SELECT DISTINCT
-                            c.user_id,
-                            json_array_elements(c.chat->'messages')->>'model' as model_name
-                        FROM public.chat c
-                        WHERE c.chat->'messages' IS NOT NULL
-                    )
-                    SELECT
-                        model_name,
-                        COUNT(DISTINCT user_id) as unique_users
-                    FROM chat_models
-                    WHERE model_name IS NOT NULL
-                    GROUP BY model_name
-                """)
-                for model_name, unique_users in cur.fetchall():
+                if CHAT_SCAN_PARTITIONS <= 1:
+                    cur.execute("""
+                        WITH chat_models AS (
+                            SELECT DISTINCT
+                                c.user_id,
+                                json_array_elements(c.chat->'messages')->>'model' as model_name
+                            FROM public.chat c
+                            WHERE c.chat->'messages' IS NOT NULL
+                        )
+                        SELECT
+                            model_name,
+                            COUNT(DISTINCT user_id) as unique_users
+                        FROM chat_models
+                        WHERE model_name IS NOT NULL
+                        GROUP BY model_name
+                    """)
+                    unique_users_by_model = cur.fetchall()
+                else:
+                    unique_users_by_model = self._unique_model_users_partitioned()
+                for model_name, unique_users in unique_users_by_model:
                     self.unique_model_users.labels(
                         model_name=model_name
                     ).set(unique_users)
 
-
                 # Debug: Tool metrics with names and emails
                 debug_query = """
                     SELECT t.user_id, u.name, u.email, t.name, COUNT(*)
@@ -101,3 +103,28 @@ def collect_metrics(self):
 
         except Exception as e:
             logger.error(f"Error collecting model metrics: {e}")
+            raise
+
+    def _unique_model_users_partitioned(self):
+        """
+        Count unique users per model with the chat scan split across
+        CHAT_SCAN_PARTITIONS connections. A user can have chats in several
+        partitions, so each partition returns its distinct (model, user) pairs
+        and the sets are merged before counting.
+        """
+        def scan(cur, index, count):
+            cur.execute(f"""
+                SELECT DISTINCT
+                    json_array_elements(c.chat->'messages')->>'model' as model_name,
+                    c.user_id
+                FROM {partition_source('public.chat', index, count)} c
+                WHERE c.chat->'messages' IS NOT NULL
+            """)
+            return cur.fetchall()
+
+        users_by_model = {}
+        for rows in run_partitioned(self.db_pool, scan, CHAT_SCAN_PARTITIONS):
+            for model_name, user_id in rows:
+                if model_name is not None:
+                    users_by_model.setdefault(model_name, set()).add(user_id)
+        return [(model_name, len(users)) for model_name, users in users_by_model.items()]
@@ -24,9 +24,6 @@ def __init__(self, db_pool):
         # Feedback metrics
         self.total_feedback = Gauge('openwebui_feedback_total', 'Total number of feedback entries')
 
-        # Start collecting metrics
-        self.collect_metrics()
-
     def collect_metrics(self):
         """Collect all system-related metrics"""
         try:
@@ -85,3 +82,4 @@ def collect_metrics(self):
 
         except Exception as e:
             logger.error(f"Error collecting system metrics: {e}")
+            raise
@@ -21,9 +21,6 @@ def __init__(self, db_pool):
                                     'Timestamp of last user activity',
                                     ['user_id', 'user_name', 'user_email'])
 
-        # Start collecting metrics
-        self.collect_metrics()
-
     def collect_metrics(self):
         """Collect all user-related metrics"""
         try:
@@ -73,3 +70,4 @@ def collect_metrics(self):
 
         except Exception as e:
             logger.error(f"Error collecting user metrics: {e}")
+            raise
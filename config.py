@@ -18,6 +18,23 @@
 DB_MIN_CONNECTIONS = int(os.getenv('DB_MIN_CONNECTIONS', '5'))
 DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', '20'))
 
+# Server-side deadline for every collector query (PostgreSQL statement_timeout).
+# When it expires the backend cancels the query and the collector fails.
+DB_QUERY_TIMEOUT_SECONDS = time_window_to_seconds(parse_time_window(os.getenv('DB_QUERY_TIMEOUT', '2m')))
+
+# Number of hash partitions over public.chat.id for the chat JSON scans.
+# Each partition runs on its own pooled connection in parallel; 1 keeps the
+# single-connection scan.
+CHAT_SCAN_PARTITIONS = int(os.getenv('CHAT_SCAN_PARTITIONS', '1'))
+
+# Number of largest chats (by stored size) exposed as openwebui_chat_largest_bytes; 0 disables
+CHAT_LARGEST_TOP_N = int(os.getenv('CHAT_LARGEST_TOP_N', '10'))
+
+# Per-collector circuit breaker
+COLLECTOR_FAILURE_THRESHOLD = int(os.getenv('COLLECTOR_FAILURE_THRESHOLD', '3'))
+COLLECTOR_BACKOFF_SECONDS = time_window_to_seconds(parse_time_window(os.getenv('COLLECTOR_BACKOFF', '5m')))
+COLLECTOR_MAX_BACKOFF_SECONDS = time_window_to_seconds(parse_time_window(os.getenv('COLLECTOR_MAX_BACKOFF', '1h')))
+
 # Convert time windows to seconds for database queries
 REQUEST_WINDOW_SECONDS = time_window_to_seconds(METRICS_REQUEST_WINDOW)
 ERROR_WINDOW_SECONDS = time_window_to_seconds(METRICS_ERROR_WINDOW)
@@ -29,3 +46,55 @@
 except ValueError:
     # If parsing fails, assume the value is in seconds
     METRICS_UPDATE_INTERVAL = int(os.getenv('METRICS_UPDATE_INTERVAL', '15'))
+
+# Collection Mode
+# 'interval' collects every METRICS_UPDATE_INTERVAL in the background,
+# 'on_demand' collects when a scrape finds the cached snapshot older than
+# METRICS_MIN_AGE
+METRICS_COLLECTION_MODE = os.getenv('METRICS_COLLECTION_MODE', 'interval').lower()
+if METRICS_COLLECTION_MODE not in ('interval', 'on_demand'):
+    raise ValueError(
+        f"Invalid METRICS_COLLECTION_MODE: {METRICS_COLLECTION_MODE}. "
+        "Use 'interval' or 'on_demand'"
+    )
+METRICS_MIN_AGE = time_window_to_seconds(parse_time_window(os.getenv('METRICS_MIN_AGE', '60s')))
+METRICS_COLLECTION_DEADLINE = time_window_to_seconds(
+    parse_time_window(os.getenv('METRICS_COLLECTION_DEADLINE', '10s'))
+)
+
+# Output Configuration
+# 'scrape' exposes /metrics, 'remote_write' pushes each completed collection
+# to REMOTE_WRITE_URL, 'both' does both
+METRICS_OUTPUT_MODE = os.getenv('METRICS_OUTPUT_MODE', 'scrape').lower()
+if METRICS_OUTPUT_MODE not in ('scrape', 'remote_write', 'both'):
+    raise ValueError(
+        f"Invalid METRICS_OUTPUT_MODE: {METRICS_OUTPUT_MODE}. "
+        "Use 'scrape', 'remote_write' or 'both'"
+    )
+
+# Remote Write Configuration
+REMOTE_WRITE_URL = os.getenv('REMOTE_WRITE_URL', '')
+REMOTE_WRITE_USERNAME = os.getenv('REMOTE_WRITE_USERNAME', '')
+REMOTE_WRITE_PASSWORD = os.getenv('REMOTE_WRITE_PASSWORD', '')
+REMOTE_WRITE_MAX_BATCH_BYTES = int(os.getenv('REMOTE_WRITE_MAX_BATCH_BYTES', '1048576'))
+REMOTE_WRITE_MAX_RETRIES = int(os.getenv('REMOTE_WRITE_MAX_RETRIES', '5'))
+REMOTE_WRITE_TIMEOUT_SECONDS = time_window_to_seconds(
+    parse_time_window(os.getenv('REMOTE_WRITE_TIMEOUT', '30s'))
+)
+REMOTE_WRITE_DELTA = os.getenv('REMOTE_WRITE_DELTA', 'false').lower() in ('1', 'true', 'yes')
+# With delta pushes, send every series again after this many pushes so that
+# unchanged series do not go stale on the receiver (0 disables resyncs)
+REMOTE_WRITE_RESYNC_EVERY = int(os.getenv('REMOTE_WRITE_RESYNC_EVERY', '4'))
+# Comma-separated metric family patterns (regular expressions matched from the
+# start of the name, so plain prefixes work). When set, only matching families
+# are pushed, and with METRICS_OUTPUT_MODE=both they are left off /metrics.
+REMOTE_WRITE_METRICS = [
+    pattern.strip() for pattern in os.getenv('REMOTE_WRITE_METRICS', '').split(',')
+    if pattern.strip()
+]
+
+if METRICS_OUTPUT_MODE in ('remote_write', 'both') and not REMOTE_WRITE_URL:
+    raise ValueError(f"REMOTE_WRITE_URL must be set when METRICS_OUTPUT_MODE={METRICS_OUTPUT_MODE}")
+
+if METRICS_COLLECTION_MODE == 'on_demand' and METRICS_OUTPUT_MODE == 'remote_write':
+    raise ValueError("METRICS_COLLECTION_MODE=on_demand requires scrapes; use METRICS_OUTPUT_MODE=scrape or both")
@@ -3,7 +3,7 @@
 import logging
 from config import (
     DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT,
-    DB_MIN_CONNECTIONS, DB_MAX_CONNECTIONS
+    DB_MIN_CONNECTIONS, DB_MAX_CONNECTIONS, DB_QUERY_TIMEOUT_SECONDS
 )
 
 logger = logging.getLogger(__name__)
@@ -27,9 +27,13 @@ def _initialize_pool(self):
                 user=DB_USER,
                 password=DB_PASSWORD,
                 host=DB_HOST,
-                port=DB_PORT
+                port=DB_PORT,
+                # statement_timeout makes the backend cancel runaway queries
+                # instead of holding the connection and burning CPU
+                options=f"-c statement_timeout={DB_QUERY_TIMEOUT_SECONDS * 1000}"
             )
-            logger.info(f"Initialized DB connection pool (min={DB_MIN_CONNECTIONS}, max={DB_MAX_CONNECTIONS})")
+            logger.info(f"Initialized DB connection pool (min={DB_MIN_CONNECTIONS}, max={DB_MAX_CONNECTIONS}, "
+                        f"query timeout={DB_QUERY_TIMEOUT_SECONDS}s)")
         except Exception as e:
             logger.error(f"Error initializing connection pool: {e}")
             raise
@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from config import DB_MAX_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+def partition_source(table, index, count):
+    """
+    FROM item holding hash partition `index` of `count` of `table` over `id`.
+
+    The hash test sits in a subquery behind OFFSET 0, which the planner does
+    not flatten, so it filters rows before any outer qual touches them.
+    Otherwise PostgreSQL orders quals by estimated cost and would run the
+    cheaper-looking JSON tests (e.g. `chat->'messages' IS NOT NULL`) first,
+    detoasting and parsing every row in every partition.
+
+    Returns the plain table when there is a single partition so unpartitioned
+    scans do not pay for hashing every row.
+    """
+    if count <= 1:
+        return table
+    return (f"(SELECT * FROM {table} "
+            f"WHERE (hashtext(id) & 2147483647) % {int(count)} = {int(index)} OFFSET 0)")
+
+
+def run_partitioned(db_pool, scan, partitions):
+    """
+    Run `scan(cur, index, count)` once per partition, each on its own pooled
+    connection, and return the per-partition results in partition order.
+
+    At most DB_MAX_CONNECTIONS - 1 partitions run at once so one connection is
+    always left for the rest of the exporter. Any partition failing fails the
+    whole scan.
+    """
+    partitions = max(1, partitions)
+
+    def run(index):
+        with db_pool.get_connection() as cur:
+            return scan(cur, index, partitions)
+
+    if partitions == 1:
+        return [run(0)]
+
+    workers = min(partitions, max(1, DB_MAX_CONNECTIONS - 1))
+    logger.debug(f"Running {partitions} partitions on {workers} connections")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='partition') as executor:
+        return list(executor.map(run, range(partitions)))
+
+
+def merge_counts(partials):
+    """
+    Merge (key..., count) rows from several partitions by summing the count of
+    rows with the same key columns.
+    """
+    merged = {}
+    for rows in partials:
+        for row in rows:
+            key, count = tuple(row[:-1]), row[-1] or 0
+            merged[key] = merged.get(key, 0) + count
+    return merged
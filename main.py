@@ -1,4 +1,4 @@
-from prometheus_client import start_http_server
+from prometheus_client import start_http_server, Gauge, REGISTRY
 import time
 import logging
 import threading
@@ -8,7 +8,19 @@
 from collectors.model_metrics import ModelMetricsCollector
 from collectors.system_metrics import SystemMetricsCollector
 from db.connection import get_db_pool
-from config import METRICS_PORT, METRICS_UPDATE_INTERVAL
+from push.remote_write import RemoteWriter
+from server.on_demand import OnDemandCollector, start_on_demand_server
+from utils.circuit_breaker import CircuitBreaker, OPEN
+from utils.registry import FilteredRegistry, compile_family_patterns
+from config import (
+    METRICS_PORT, METRICS_UPDATE_INTERVAL, METRICS_OUTPUT_MODE,
+    METRICS_COLLECTION_MODE, METRICS_MIN_AGE, METRICS_COLLECTION_DEADLINE,
+    REMOTE_WRITE_URL, REMOTE_WRITE_USERNAME, REMOTE_WRITE_PASSWORD,
+    REMOTE_WRITE_MAX_BATCH_BYTES, REMOTE_WRITE_MAX_RETRIES,
+    REMOTE_WRITE_TIMEOUT_SECONDS, REMOTE_WRITE_DELTA, REMOTE_WRITE_RESYNC_EVERY,
+    REMOTE_WRITE_METRICS,
+    COLLECTOR_FAILURE_THRESHOLD, COLLECTOR_BACKOFF_SECONDS, COLLECTOR_MAX_BACKOFF_SECONDS
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,30 +28,126 @@
 )
 logger = logging.getLogger(__name__)
 
+COLLECTOR_CLASSES = [
+    UserMetricsCollector,
+    ChatMetricsCollector,
+    DocumentMetricsCollector,
+    ModelMetricsCollector,
+    SystemMetricsCollector
+]
+
+def scrape_registry():
+    """Registry served on /metrics, without the families that are pushed instead"""
+    if METRICS_OUTPUT_MODE == 'both' and REMOTE_WRITE_METRICS:
+        return FilteredRegistry(REGISTRY, exclude=compile_family_patterns(REMOTE_WRITE_METRICS))
+    return REGISTRY
+
+def push_registry():
+    """Registry pushed via remote write"""
+    if REMOTE_WRITE_METRICS:
+        return FilteredRegistry(REGISTRY, include=compile_family_patterns(REMOTE_WRITE_METRICS))
+    return REGISTRY
+
 class MetricsCollectorManager:
     def __init__(self):
         self.db_pool = get_db_pool()
         self.collectors = []
+        self.breakers = {}
+        self.remote_writer = None
+        self.push_lock = threading.Lock()
+
+        # Collector health
+        self.collector_stale = Gauge('openwebui_exporter_collector_stale',
+                                   'Whether the collector is serving values from an earlier successful run (1) or fresh values (0)',
+                                   ['collector'])
+        self.collector_circuit_open = Gauge('openwebui_exporter_collector_circuit_open',
+                                          'Whether the collector circuit breaker is open',
+                                          ['collector'])
+        self.collector_last_success = Gauge('openwebui_exporter_collector_last_success_timestamp_seconds',
+                                          'Timestamp of the last successful collection',
+                                          ['collector'])
+
         self.initialize_collectors()
+        self.initialize_remote_writer()
 
     def initialize_collectors(self):
         """Initialize all metric collectors"""
-        self.collectors = [
-            UserMetricsCollector(self.db_pool),
-            ChatMetricsCollector(self.db_pool),
-            DocumentMetricsCollector(self.db_pool),
-            ModelMetricsCollector(self.db_pool),
-            SystemMetricsCollector(self.db_pool)
-        ]
+        self.collectors = [collector_class(self.db_pool) for collector_class in COLLECTOR_CLASSES]
+        self.breakers = {
+            collector.__class__.__name__: CircuitBreaker(
+                collector.__class__.__name__,
+                failure_threshold=COLLECTOR_FAILURE_THRESHOLD,
+                backoff=COLLECTOR_BACKOFF_SECONDS,
+                max_backoff=COLLECTOR_MAX_BACKOFF_SECONDS
+            )
+            for collector in self.collectors
+        }
         logger.info("Initialized all metric collectors")
 
+    def initialize_remote_writer(self):
+        """Initialize the remote-write pusher if enabled"""
+        if METRICS_OUTPUT_MODE not in ('remote_write', 'both'):
+            return
+        self.remote_writer = RemoteWriter(
+            REMOTE_WRITE_URL,
+            max_batch_bytes=REMOTE_WRITE_MAX_BATCH_BYTES,
+            max_retries=REMOTE_WRITE_MAX_RETRIES,
+            timeout=REMOTE_WRITE_TIMEOUT_SECONDS,
+            delta=REMOTE_WRITE_DELTA,
+            resync_every=REMOTE_WRITE_RESYNC_EVERY,
+            username=REMOTE_WRITE_USERNAME,
+            password=REMOTE_WRITE_PASSWORD,
+            registry=push_registry()
+        )
+        logger.info(f"Remote write enabled (url={REMOTE_WRITE_URL}, delta={REMOTE_WRITE_DELTA}, "
+                    f"metrics={','.join(REMOTE_WRITE_METRICS) or 'all'})")
+
     def update_metrics(self):
         """Update all metrics"""
+        self.collect_metrics()
+        self.push_metrics()
+
+    def collect_metrics(self):
+        """Run every collector whose circuit breaker allows it"""
         for collector in self.collectors:
+            name = collector.__class__.__name__
+            breaker = self.breakers[name]
+            if not breaker.allow_request():
+                # Keep serving the last good values, marked stale
+                logger.warning(f"Circuit open for {name}, skipping "
+                               f"(retry in {breaker.seconds_until_retry():.0f}s)")
+                self.collector_stale.labels(collector=name).set(1)
+                continue
+
             try:
                 collector.collect_metrics()
+                breaker.record_success()
+                self.collector_stale.labels(collector=name).set(0)
+                self.collector_last_success.labels(collector=name).set_to_current_time()
             except Exception as e:
-                logger.error(f"Error updating metrics for {collector.__class__.__name__}: {e}")
+                breaker.record_failure()
+                self.collector_stale.labels(collector=name).set(1)
+                logger.error(f"Error updating metrics for {name} "
+                             f"({breaker.consecutive_failures} consecutive failures): {e}")
+                if breaker.state == OPEN:
+                    logger.warning(f"Circuit opened for {name}, next attempt in {breaker.current_backoff}s")
+            self.collector_circuit_open.labels(collector=name).set(1 if breaker.state == OPEN else 0)
+
+    def push_metrics(self):
+        """Push the current metrics via remote write, if enabled"""
+        if self.remote_writer is None:
+            return
+        # A slow receiver can outlast the next on-demand collection; skip
+        # rather than queue pushes, the next one sends whatever changed
+        if not self.push_lock.acquire(blocking=False):
+            logger.warning("Previous remote-write push still running, skipping this one")
+            return
+        try:
+            self.remote_writer.push()
+        except Exception as e:
+            logger.error(f"Error pushing metrics via remote write: {e}")
+        finally:
+            self.push_lock.release()
 
     def start_metrics_collection(self):
         """Start periodic metrics collection"""
@@ -54,20 +162,37 @@ def start_metrics_collection(self):
 
 def main():
     try:
-        # Start up the server to expose the metrics.
-        logger.info(f"Starting OpenWebUI exporter on port {METRICS_PORT}")
-        start_http_server(METRICS_PORT)
+        if METRICS_COLLECTION_MODE == 'on_demand':
+            # Collectors run when a scrape finds the cached snapshot too old
+            metrics_manager = MetricsCollectorManager()
+            on_demand = OnDemandCollector(
+                metrics_manager.collect_metrics,
+                after_collect=metrics_manager.push_metrics,
+                min_age=METRICS_MIN_AGE,
+                deadline=METRICS_COLLECTION_DEADLINE,
+                registry=scrape_registry()
+            )
+            logger.info(f"Starting OpenWebUI exporter on port {METRICS_PORT} "
+                        f"(on-demand, min age: {METRICS_MIN_AGE}s, deadline: {METRICS_COLLECTION_DEADLINE}s)")
+            start_on_demand_server(METRICS_PORT, on_demand)
+        else:
+            # Start up the server to expose the metrics.
+            if METRICS_OUTPUT_MODE in ('scrape', 'both'):
+                logger.info(f"Starting OpenWebUI exporter on port {METRICS_PORT}")
+                start_http_server(METRICS_PORT, registry=scrape_registry())
+            else:
+                logger.info("Starting OpenWebUI exporter in remote-write only mode")
 
-        # Initialize metrics collector manager
-        metrics_manager = MetricsCollectorManager()
+            # Initialize metrics collector manager
+            metrics_manager = MetricsCollectorManager()
 
-        # Start metrics collection in a separate thread
-        collection_thread = threading.Thread(
-            target=metrics_manager.start_metrics_collection,
-            daemon=True
-        )
-        collection_thread.start()
-        logger.info(f"Started metrics collection thread (interval: {METRICS_UPDATE_INTERVAL}s)")
+            # Start metrics collection in a separate thread
+            collection_thread = threading.Thread(
+                target=metrics_manager.start_metrics_collection,
+                daemon=True
+            )
+            collection_thread.start()
+            logger.info(f"Started metrics collection thread (interval: {METRICS_UPDATE_INTERVAL}s)")
 
         # Keep the main thread running
         while True:
@@ -0,0 +1,118 @@
+"""
+One-shot profiler for the collector set.
+
+Connects with the normal config.py settings, runs each collector's
+collect_metrics once without starting the HTTP server and reports per-query
+wall time, rows fetched, approximate bytes fetched and exporter-side CPU.
+
+Examples:
+    python profile_collectors.py
+    python profile_collectors.py --format json --explain > report.json
+    python profile_collectors.py --collector ChatMetricsCollector --cprofile chat.prof
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from db.connection import get_db_pool
+from main import COLLECTOR_CLASSES
+from utils.profiling import ProfilingPool, QueryRecorder, ThreadProfiler
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    names = [collector_class.__name__ for collector_class in COLLECTOR_CLASSES]
+    parser = argparse.ArgumentParser(description="Run every collector once and report query costs")
+    parser.add_argument('--format', choices=('table', 'json'), default='table',
+                        help="Report format (default: table)")
+    parser.add_argument('--collector', action='append', choices=names, metavar='NAME',
+                        help=f"Only run this collector; can be repeated. One of: {', '.join(names)}")
+    parser.add_argument('--explain', action='store_true',
+                        help="Capture EXPLAIN (ANALYZE, BUFFERS) for every query. Runs each query twice")
+    parser.add_argument('--cprofile', metavar='PATH',
+                        help="Write cProfile stats of the Python side to PATH, including "
+                             "partition worker threads")
+    return parser.parse_args(argv)
+
+
+def run_collectors(db_pool, recorder, collector_classes, profiler=None):
+    """Run each collector once and return per-collector results"""
+    results = []
+    for collector_class in collector_classes:
+        name = collector_class.__name__
+        recorder.current_collector = name
+        error = None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            collector_class(db_pool).collect_metrics()
+        except Exception as e:
+            error = str(e)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        results.append({
+            'collector': name,
+            'wall_seconds': time.perf_counter() - wall_start,
+            'cpu_seconds': time.process_time() - cpu_start,
+            'error': error,
+            'queries': [q.to_dict() for q in recorder.for_collector(name)],
+        })
+    return results
+
+
+def format_table(results):
+    """Render results as a plain-text table"""
+    header = f"{'collector / query':<72} {'wall ms':>10} {'cpu ms':>9} {'rows':>9} {'bytes':>12}"
+    lines = [header, '-' * len(header)]
+    for result in results:
+        rows = sum(q['rows'] for q in result['queries'])
+        size = sum(q['bytes'] for q in result['queries'])
+        lines.append(f"{result['collector']:<72} {result['wall_seconds'] * 1000:>10.1f} "
+                     f"{result['cpu_seconds'] * 1000:>9.1f} {rows:>9} {size:>12}")
+        if result['error']:
+            lines.append(f"  ERROR: {result['error']}")
+        for query in result['queries']:
+            sql = query['sql'] if len(query['sql']) <= 68 else query['sql'][:65] + '...'
+            lines.append(f"  {sql:<70} {query['wall_seconds'] * 1000:>10.1f} "
+                         f"{query['cpu_seconds'] * 1000:>9.1f} {query['rows']:>9} {query['bytes']:>12}")
+            if query['plan']:
+                lines.extend(f"      {plan_line}" for plan_line in query['plan'].splitlines())
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    collector_classes = [
+        collector_class for collector_class in COLLECTOR_CLASSES
+        if not args.collector or collector_class.__name__ in args.collector
+    ]
+    recorder = QueryRecorder(explain=args.explain)
+    profiler = ThreadProfiler() if args.cprofile else None
+    db_pool = ProfilingPool(get_db_pool(), recorder, profiler)
+
+    try:
+        results = run_collectors(db_pool, recorder, collector_classes, profiler)
+    finally:
+        db_pool.close_all()
+
+    if profiler is not None:
+        profiler.dump_stats(args.cprofile)
+        print(f"Wrote cProfile stats to {args.cprofile}", file=sys.stderr)
+
+    if args.format == 'json':
+        print(json.dumps({'collectors': results}, indent=2))
+    else:
+        print(format_table(results))
+
+    return 1 if any(result['error'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
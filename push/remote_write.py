@@ -0,0 +1,175 @@
+from prometheus_client import REGISTRY
+import base64
+import logging
+import math
+import struct
+import time
+import urllib.error
+import urllib.request
+import snappy
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes that are worth retrying; everything else in the 4xx range
+# means the receiver rejected the payload and resending it will not help
+RETRYABLE_STATUS_CODES = (429,)
+
+
+def _encode_varint(value):
+    """Encode a non-negative integer as a protobuf varint"""
+    out = bytearray()
+    while True:
+        bits = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _encode_bytes_field(field_number, payload):
+    """Encode a length-delimited protobuf field"""
+    return _encode_varint((field_number << 3) | 2) + _encode_varint(len(payload)) + payload
+
+
+def encode_timeseries(labels, value, timestamp_ms):
+    """
+    Encode a single prometheus.TimeSeries message.
+
+    Args:
+        labels: Tuple of (name, value) pairs sorted by name, including __name__
+        value: Sample value
+        timestamp_ms: Sample timestamp in milliseconds
+
+    Returns:
+        Serialized TimeSeries message (without the outer WriteRequest field tag)
+    """
+    out = bytearray()
+    for name, label_value in labels:
+        label = (_encode_bytes_field(1, name.encode('utf-8')) +
+                 _encode_bytes_field(2, label_value.encode('utf-8')))
+        out += _encode_bytes_field(1, label)
+    # Sample: field 1 is a double (wire type 1), field 2 an int64 varint
+    sample = b'\x09' + struct.pack('<d', value) + b'\x10' + _encode_varint(timestamp_ms)
+    out += _encode_bytes_field(2, sample)
+    return bytes(out)
+
+
+def series_from_registry(registry=REGISTRY):
+    """
+    Flatten a registry into {labels: value} where labels is a sorted tuple of
+    (name, value) pairs including __name__.
+    """
+    series = {}
+    for metric in registry.collect():
+        for sample in metric.samples:
+            labels = dict(sample.labels)
+            labels['__name__'] = sample.name
+            series[tuple(sorted(labels.items()))] = float(sample.value)
+    return series
+
+
+class RemoteWriter:
+    """Pushes registry snapshots to a Prometheus remote-write endpoint"""
+
+    def __init__(self, url, max_batch_bytes=1048576, max_retries=5, timeout=30,
+                 delta=False, resync_every=0, username='', password='',
+                 registry=REGISTRY):
+        self.url = url
+        self.max_batch_bytes = max_batch_bytes
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.delta = delta
+        self.resync_every = resync_every
+        self.registry = registry
+        self.auth_header = None
+        if username:
+            token = base64.b64encode(f"{username}:{password}".encode('utf-8')).decode('ascii')
+            self.auth_header = f"Basic {token}"
+
+        # Values sent by the last successful push, used for delta pushes
+        self._last_pushed = {}
+        self._pushes_since_resync = 0
+
+    def push(self):
+        """Push the current registry contents, returning the number of series sent"""
+        current = series_from_registry(self.registry)
+
+        full_push = (not self.delta or not self._last_pushed or
+                     (self.resync_every > 0 and self._pushes_since_resync >= self.resync_every))
+        if full_push:
+            changed = current
+        else:
+            changed = {
+                labels: value for labels, value in current.items()
+                if not self._same_value(self._last_pushed.get(labels), value)
+            }
+
+        timestamp_ms = int(time.time() * 1000)
+        sent = 0
+        for batch in self._batches(changed, timestamp_ms):
+            self._send(batch)
+            sent += 1
+
+        # Only remember what was actually delivered; a failed batch raises above
+        # and the next push will resend everything that differs
+        self._last_pushed = current
+        self._pushes_since_resync = 0 if full_push else self._pushes_since_resync + 1
+        logger.info(f"Pushed {len(changed)} of {len(current)} series in {sent} remote-write request(s)")
+        return len(changed)
+
+    @staticmethod
+    def _same_value(previous, value):
+        if previous is None:
+            return False
+        if math.isnan(previous) and math.isnan(value):
+            return True
+        return previous == value
+
+    def _batches(self, series, timestamp_ms):
+        """Yield serialized WriteRequest bodies no larger than max_batch_bytes (uncompressed)"""
+        batch = bytearray()
+        for labels, value in series.items():
+            encoded = _encode_bytes_field(1, encode_timeseries(labels, value, timestamp_ms))
+            if batch and len(batch) + len(encoded) > self.max_batch_bytes:
+                yield bytes(batch)
+                batch = bytearray()
+            batch += encoded
+        if batch:
+            yield bytes(batch)
+
+    def _send(self, body):
+        """Send one WriteRequest, retrying with exponential backoff"""
+        payload = snappy.compress(body)
+        headers = {
+            'Content-Encoding': 'snappy',
+            'Content-Type': 'application/x-protobuf',
+            'User-Agent': 'openwebui-exporter',
+            'X-Prometheus-Remote-Write-Version': '0.1.0',
+        }
+        if self.auth_header:
+            headers['Authorization'] = self.auth_header
+
+        attempt = 0
+        while True:
+            request = urllib.request.Request(self.url, data=payload, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                return
+            except urllib.error.HTTPError as e:
+                if e.code < 500 and e.code not in RETRYABLE_STATUS_CODES:
+                    logger.error(f"Remote write rejected with HTTP {e.code}, dropping batch")
+                    raise
+                error = e
+            except (urllib.error.URLError, OSError) as e:
+                error = e
+
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.error(f"Remote write failed after {self.max_retries} retries: {error}")
+                raise error
+            backoff = min(2 ** (attempt - 1), 30)
+            logger.warning(f"Remote write failed ({error}), retrying in {backoff}s")
+            time.sleep(backoff)
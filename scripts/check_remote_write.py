@@ -0,0 +1,158 @@
+"""
+Exercise RemoteWriter against a local stand-in remote-write receiver.
+
+Starts an HTTP receiver on localhost that decodes snappy-compressed
+WriteRequest bodies, pushes a throwaway registry through RemoteWriter and
+checks batching, framing, retries, delta pushes, resyncs and family
+selection. Needs only the packages from requirements.txt; no database.
+
+    python scripts/check_remote_write.py
+"""
+import os
+import struct
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import snappy
+from prometheus_client import CollectorRegistry, Gauge
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from push.remote_write import RemoteWriter  # noqa: E402
+from utils.registry import FilteredRegistry, compile_family_patterns  # noqa: E402
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(data):
+    """Yield (field number, wire type, value) from a protobuf message"""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"Unexpected wire type {wire_type}")
+        yield field, wire_type, value
+
+
+def decode_write_request(body):
+    """Decode a WriteRequest into a list of (labels dict, value, timestamp_ms)"""
+    series = []
+    for field, _, timeseries in _fields(body):
+        assert field == 1, f"unexpected WriteRequest field {field}"
+        labels, samples = {}, []
+        for ts_field, _, payload in _fields(timeseries):
+            if ts_field == 1:
+                label = {f: v.decode('utf-8') for f, _, v in _fields(payload)}
+                labels[label[1]] = label[2]
+            elif ts_field == 2:
+                sample = {f: v for f, _, v in _fields(payload)}
+                samples.append((struct.unpack('<d', sample[1])[0], sample[2]))
+        assert list(labels) == sorted(labels), "labels must be sorted by name"
+        assert len(samples) == 1, "expected one sample per series"
+        series.append((labels, samples[0][0], samples[0][1]))
+    return series
+
+
+class Receiver:
+    """Local stand-in for a remote-write endpoint"""
+
+    def __init__(self):
+        self.requests = []
+        self.fail_next = 0
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if receiver.fail_next:
+                    receiver.fail_next -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                assert self.headers['Content-Encoding'] == 'snappy'
+                assert self.headers['Content-Type'] == 'application/x-protobuf'
+                assert self.headers['X-Prometheus-Remote-Write-Version'] == '0.1.0'
+                raw = snappy.uncompress(body)
+                receiver.requests.append((len(raw), decode_write_request(raw)))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/write"
+
+    def take(self):
+        requests, self.requests = self.requests, []
+        return requests
+
+
+def main():
+    receiver = Receiver()
+    registry = CollectorRegistry()
+    chats = Gauge('openwebui_chats_by_model', 'chats', ['model_name'], registry=registry)
+    users = Gauge('openwebui_users_total', 'users', registry=registry)
+    for i in range(200):
+        chats.labels(model_name=f"model-{i}").set(i)
+    users.set(5)
+
+    # Full push split into size-bounded batches
+    writer = RemoteWriter(receiver.url, max_batch_bytes=2048, max_retries=2,
+                          delta=True, resync_every=2, registry=registry)
+    assert writer.push() == 201
+    requests = receiver.take()
+    assert len(requests) > 1, "expected several batches"
+    assert all(size <= 2048 for size, _ in requests), "batch exceeds max_batch_bytes"
+    received = {tuple(sorted(labels.items())): value for _, series in requests for labels, value, _ in series}
+    assert len(received) == 201
+    assert received[(('__name__', 'openwebui_chats_by_model'), ('model_name', 'model-7'))] == 7.0
+    print(f"full push: 201 series in {len(requests)} batches")
+
+    # Delta push only sends changed series, retrying through a 503
+    chats.labels(model_name='model-3').set(42)
+    receiver.fail_next = 1
+    assert writer.push() == 1
+    series = [s for _, batch in receiver.take() for s in batch]
+    assert [(labels['model_name'], value) for labels, value, _ in series] == [('model-3', 42.0)]
+    print("delta push after retry: 1 series")
+
+    # Nothing changed: empty deltas, then a full resync after resync_every deltas
+    assert writer.push() == 0
+    assert receiver.take() == []
+    assert writer.push() == 201
+    assert sum(len(batch) for _, batch in receiver.take()) == 201
+    print("resync: 201 series")
+
+    # Family selection
+    selected = FilteredRegistry(registry, include=compile_family_patterns(['openwebui_users']))
+    assert RemoteWriter(receiver.url, registry=selected).push() == 1
+    names = {labels['__name__'] for _, batch in receiver.take() for labels, _, _ in batch}
+    assert names == {'openwebui_users_total'}
+    print("family selection: only openwebui_users_total pushed")
+
+    receiver.server.shutdown()
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
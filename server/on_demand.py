@@ -0,0 +1,111 @@
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class OnDemandCollector:
+    """
+    Serves cached registry snapshots, refreshing them when a scrape finds the
+    snapshot older than min_age.
+
+    Concurrent scrapes share a single in-flight collection. A scrape waits at
+    most `deadline` seconds for it and otherwise gets the previous snapshot;
+    the collection keeps running in the background and the next scrape picks
+    up its result.
+
+    `after_collect` (e.g. a remote-write push) runs once the new snapshot has
+    been published, so scrapes never wait on it.
+    """
+
+    def __init__(self, collect, min_age, deadline, registry=REGISTRY, after_collect=None):
+        self.collect = collect
+        self.after_collect = after_collect
+        self.min_age = min_age
+        self.deadline = deadline
+        self.registry = registry
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_time = 0.0
+        self._in_flight = None
+
+    def get_snapshot(self):
+        """Return the exposition-format payload to serve for a scrape"""
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_time < self.min_age:
+                return self._snapshot
+            if self._in_flight is None:
+                self._in_flight = threading.Event()
+                threading.Thread(
+                    target=self._run_collection,
+                    args=(self._in_flight,),
+                    daemon=True
+                ).start()
+            in_flight = self._in_flight
+
+        if not in_flight.wait(self.deadline):
+            logger.warning(f"Collection did not finish within {self.deadline}s, serving previous snapshot")
+
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            # Nothing has completed yet, serve whatever the collectors have set so far
+            snapshot = generate_latest(self.registry)
+        return snapshot
+
+    def _run_collection(self, in_flight):
+        started = time.monotonic()
+        snapshot = None
+        try:
+            self.collect()
+            snapshot = generate_latest(self.registry)
+            logger.debug(f"On-demand collection finished in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logger.error(f"Error in on-demand collection: {e}")
+        finally:
+            with self._lock:
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    self._snapshot_time = started
+                self._in_flight = None
+            in_flight.set()
+
+        if snapshot is not None and self.after_collect is not None:
+            try:
+                self.after_collect()
+            except Exception as e:
+                logger.error(f"Error after on-demand collection: {e}")
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """Thread per request so scrapes can wait on the same collection"""
+    daemon_threads = True
+
+
+class _SilentHandler(WSGIRequestHandler):
+    """WSGI handler that does not log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_on_demand_server(port, on_demand_collector, addr='0.0.0.0'):
+    """Start a /metrics server backed by an OnDemandCollector in a daemon thread"""
+
+    def app(environ, start_response):
+        if environ.get('PATH_INFO', '/') not in ('/', '/metrics'):
+            start_response('404 Not Found', [('Content-Type', 'text/plain')])
+            return [b'Not Found']
+        body = on_demand_collector.get_snapshot()
+        start_response('200 OK', [('Content-Type', CONTENT_TYPE_LATEST)])
+        return [body]
+
+    httpd = make_server(addr, port, app, _ThreadingWSGIServer, handler_class=_SilentHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
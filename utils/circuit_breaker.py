@@ -0,0 +1,59 @@
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Per-collector circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures and
+    rejects calls until its backoff expires. The next call is then let through
+    as a trial (half-open): success closes the breaker, failure reopens it with
+    the backoff doubled, up to `max_backoff` seconds.
+    """
+
+    def __init__(self, name, failure_threshold=3, backoff=300, max_backoff=3600):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.current_backoff = backoff
+        self.retry_at = 0.0
+
+    def allow_request(self):
+        """Return True if the protected call should be attempted now"""
+        with self._lock:
+            if self.state != OPEN:
+                return True
+            if time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def seconds_until_retry(self):
+        """Seconds left before an open breaker lets a trial call through"""
+        with self._lock:
+            return max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.current_backoff = self.backoff
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state == HALF_OPEN:
+                    self.current_backoff = min(self.current_backoff * 2, self.max_backoff)
+                self.state = OPEN
+                self.retry_at = time.monotonic() + self.current_backoff
@@ -0,0 +1,213 @@
+import cProfile
+import pstats
+import sys
+import threading
+import time
+
+# cProfile only covers the enabling thread before 3.12 (see ThreadProfiler)
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+def _value_size(value):
+    """Approximate size of a fetched value as received in text form"""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return len(str(value).encode('utf-8'))
+
+
+def _rows_size(rows):
+    return sum(_value_size(value) for row in rows for value in row)
+
+
+class QueryStats:
+    """Timing and volume of a single executed query"""
+
+    def __init__(self, collector, sql):
+        self.collector = collector
+        self.sql = sql
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.plan = None
+
+    def to_dict(self):
+        return {
+            'collector': self.collector,
+            'sql': self.sql,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'plan': self.plan,
+        }
+
+
+class QueryRecorder:
+    """Collects QueryStats from every profiling cursor"""
+
+    def __init__(self, explain=False):
+        self.explain = explain
+        self.current_collector = None
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def start_query(self, sql):
+        stats = QueryStats(self.current_collector, sql)
+        with self._lock:
+            self.queries.append(stats)
+        return stats
+
+    def for_collector(self, collector):
+        return [q for q in self.queries if q.collector == collector]
+
+
+class ProfilingCursor:
+    """
+    Cursor proxy that records wall time, thread CPU time, rows and approximate
+    bytes fetched for each query, and optionally its EXPLAIN (ANALYZE, BUFFERS)
+    plan.
+
+    Bytes are estimated from the size of the fetched values in text form;
+    psycopg2 does not expose wire-level byte counts.
+    """
+
+    def __init__(self, cursor, recorder):
+        self._cursor = cursor
+        self._recorder = recorder
+        self._stats = None
+
+    def execute(self, query, vars=None):
+        stats = self._recorder.start_query(' '.join(str(query).split()))
+        if self._recorder.explain:
+            # EXPLAIN ANALYZE runs the query, so this doubles its cost on the
+            # database; the plan is captured before the timed execution
+            self._cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", vars)
+            stats.plan = '\n'.join(row[0] for row in self._cursor.fetchall())
+
+        self._stats = stats
+        self._timed(self._cursor.execute, query, vars)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None and self._stats is not None:
+            self._stats.rows += 1
+            self._stats.bytes += _rows_size([row])
+        return row
+
+    def fetchmany(self, size=None):
+        args = () if size is None else (size,)
+        rows = self._timed(self._cursor.fetchmany, *args)
+        self._count(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._count(rows)
+        return rows
+
+    def _count(self, rows):
+        if self._stats is not None:
+            self._stats.rows += len(rows)
+            self._stats.bytes += _rows_size(rows)
+
+    def _timed(self, func, *args):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args)
+        finally:
+            if self._stats is not None:
+                self._stats.wall_seconds += time.perf_counter() - wall_start
+                self._stats.cpu_seconds += time.thread_time() - cpu_start
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ThreadProfiler:
+    """
+    cProfile for the calling thread plus any worker thread that opens a
+    pooled connection while profiling is enabled.
+
+    Before Python 3.12, cProfile.Profile.enable() only covers the thread that
+    calls it, so the partitioned chat scans running in run_partitioned's
+    worker threads get a profile of their own and all profiles are merged
+    when dumped. From 3.12 on cProfile is built on sys.monitoring, which is
+    interpreter-wide: the main profile already records worker threads and
+    enabling a second one raises ValueError, so no worker profiles are made.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self._owner = None
+        self._worker_profiles = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self._owner = threading.get_ident()
+        self.profile.enable()
+
+    def disable(self):
+        self.profile.disable()
+        self._owner = None
+
+    def start_worker(self):
+        """Start profiling the current thread if it is a worker; returns its profile or None"""
+        if not PER_THREAD_PROFILES or self._owner is None or threading.get_ident() == self._owner:
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop_worker(self, profile):
+        if profile is None:
+            return
+        profile.disable()
+        with self._lock:
+            self._worker_profiles.append(profile)
+
+    def dump_stats(self, path):
+        stats = pstats.Stats(self.profile)
+        for profile in self._worker_profiles:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+
+class _ProfilingConnection:
+    """Context manager wrapping a pooled connection's cursor in a ProfilingCursor"""
+
+    def __init__(self, connection, recorder, profiler=None):
+        self._connection = connection
+        self._recorder = recorder
+        self._profiler = profiler
+        self._worker_profile = None
+
+    def __enter__(self):
+        if self._profiler is not None:
+            self._worker_profile = self._profiler.start_worker()
+        return ProfilingCursor(self._connection.__enter__(), self._recorder)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return self._connection.__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            if self._profiler is not None:
+                self._profiler.stop_worker(self._worker_profile)
+
+
+class ProfilingPool:
+    """Drop-in replacement for DatabasePool that records every query"""
+
+    def __init__(self, db_pool, recorder, profiler=None):
+        self.db_pool = db_pool
+        self.recorder = recorder
+        self.profiler = profiler
+
+    def get_connection(self):
+        return _ProfilingConnection(self.db_pool.get_connection(), self.recorder, self.profiler)
+
+    def close_all(self):
+        self.db_pool.close_all()
@@ -0,0 +1,36 @@
+import re
+
+
+def compile_family_patterns(patterns):
+    """Compile a list of metric family name patterns; each is matched from the start of the name"""
+    return [re.compile(pattern) for pattern in patterns]
+
+
+class FilteredRegistry:
+    """
+    Read-only view of a registry that only yields selected metric families.
+
+    Families whose name matches one of `include` (if given) and none of
+    `exclude` are kept. Patterns are regular expressions matched from the
+    start of the family name, so a plain prefix such as 'openwebui_chat'
+    works as well.
+    """
+
+    def __init__(self, registry, include=None, exclude=None):
+        self.registry = registry
+        self.include = include or []
+        self.exclude = exclude or []
+
+    def selected(self, name):
+        if self.include and not any(pattern.match(name) for pattern in self.include):
+            return False
+        return not any(pattern.match(name) for pattern in self.exclude)
+
+    def collect(self):
+        for metric in self.registry.collect():
+            if self.selected(metric.name):
+                yield metric
+
+    def restricted_registry(self, names):
+        """Support the ?name[]= filter of the prometheus_client HTTP server"""
+        return FilteredRegistry(self.registry.restricted_registry(names), self.include, self.exclude)